@@ -10,26 +10,79 @@ The server is initialized in the main function.
 """
 
 import os
+import sys
+import queue
+import atexit
+import asyncio
+import logging
 import configparser
-from async_lru import alru_cache
+import importlib.util
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
+
+import anyio
 from mcp.server.fastmcp import FastMCP
 
 from uc.get_all_tables import get_all_tables
 from uc.get_table_details import get_table_details
+from uc.http_client import close_session, warm_connections
+
+logger = logging.getLogger(__name__)
+
+# Keeps a reference to fire-and-forget tasks, so they aren't garbage collected while running
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def warm_topology_cache(databricks_host: str, databricks_token: str):
+    """
+    Fetches all tables in the workspace once, so the catalog/schema/table cache is already
+    populated when the first tool call comes in.
+
+    Args:
+        databricks_host (str): databricks host
+        databricks_token (str): databricks token
+    """
+    try:
+        await get_all_tables(databricks_host, databricks_token)
+    except Exception as e:
+        logger.warning("Warming the Unity Catalog cache failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    # Warm the cache in the background when a workspace is configured through the environment,
+    # it must not hold up the MCP handshake
+    warmup = None
+    databricks_host = os.getenv("DATABRICKS_HOST")
+    databricks_token = os.getenv("DATABRICKS_TOKEN")
+    if databricks_host and databricks_token:
+        warmup = asyncio.create_task(
+            warm_topology_cache(databricks_host, databricks_token)
+        )
+
+    # Close the shared HTTP session when the server shuts down
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+        await close_session()
 
 
 # Initialize FastMCP server
-mcp = FastMCP("RevoData Databricks Unity Catalog MCP")
+mcp = FastMCP("RevoData Databricks Unity Catalog MCP", lifespan=lifespan)
 
 
 @mcp.tool(
     name="get-databricks-profiles",
     description="Get all databricks profiles from the user's configuration file to authenticate with Databricks. Always ask which profile the user wants to use. Never print out the tokens to the user.",
 )
-def get_databricks_profiles():
+async def get_databricks_profiles():
     """
     Retrieves all available Databricks Workspace profiles (host/token combinations) from the user's .databrickscfg configuration file.
 
+    The next tool call will use one of these hosts, so connections to them are warmed up in the background.
+
     Returns:
         dict[str, dict[str, str]]: A dictionary mapping profile names to their corresponding configuration key-value pairs.
     """
@@ -42,26 +95,28 @@ def get_databricks_profiles():
         items = dict(config.items(section))
         output_dict[section] = items
 
+    hosts = {items["host"] for items in output_dict.values() if items.get("host")}
+    task = asyncio.create_task(warm_connections(hosts))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
     return output_dict
 
 
-@alru_cache()
 @mcp.tool(
     name="get-all-catalogs-schemas-tables-in-workspace",
     description="Get all tables in all catalogs and schemas available in all Unity Catalogs assigned to a Databricks Workspace",
 )
 async def get_all_tables_in_workspace(databricks_host: str, databricks_token: str):
     """
-    Asynchronously retrieves all tables from all Catalogs assigned to a Databricks Workspace, returning the results
-    in a standardized response dictionary indicating success or error.
+    Asynchronously retrieves all tables from all Catalogs assigned to a Databricks Workspace.
+    Errors are raised and reported by FastMCP as a failed tool call.
     Args:
         databricks_host (str): databricks host
         databricks_token (str): databricks token
 
     Returns:
-        dict[str, any]:
-            On success: {"resource": <nested catalog-schema-table dict>, "status": "success"}
-            On failure: {"error": {"message": <error message>}}
+        dict[str, dict[str, list[str]]]: Nested dictionary mapping catalog names to schema names to lists of table names.
     """
     result = await get_all_tables(databricks_host, databricks_token)
     return result
@@ -83,9 +138,9 @@ async def get_table_details_by_full_tablename(
         full_table_names (list[str]): List of tables to get the details for, must be in format catalog.schema.tablename
 
     Returns:
-        dict[str, any]:
-            On success: {"resource": <list of dictionaries containing table data>, "status": "success"}
-            On failure: {"error": {"message": <error message>}}
+        dict[str, list[dict[str, any]]]:
+            {"tables": <list of dictionaries containing table data>, "errors": <list of tables that failed, with the error message>}
+        When every table fails, the error is raised and reported by FastMCP as a failed tool call.
     """
     result = await get_table_details(
         databricks_host, databricks_token, full_table_names
@@ -93,9 +148,39 @@ async def get_table_details_by_full_tablename(
     return result
 
 
+def configure_logging():
+    """
+    Routes all log records through a queue to the actual handlers, which run on a background thread.
+    Logging from a coroutine then never blocks the event loop on a write to stderr.
+
+    The handlers already on the root logger (FastMCP installs its own) are moved behind the queue.
+    Without any, records go to stderr, since stdout is used by the MCP stdio transport.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers or [logging.StreamHandler(sys.stderr)]
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    atexit.register(listener.stop)
+
+
+def run_server():
+    """
+    Runs the MCP server over stdio. Uses uvloop as the event loop when it is available (Linux and
+    macOS), it schedules the many small request tasks faster than the default asyncio loop.
+
+    The loop is passed to anyio as a backend option rather than installed as a global event loop
+    policy, since uvloop.install() and event loop policies are deprecated in newer Python versions.
+    """
+    use_uvloop = importlib.util.find_spec("uvloop") is not None
+    anyio.run(mcp.run_stdio_async, backend_options={"use_uvloop": use_uvloop})
+
+
 def main():
     # Core application logic
-    mcp.run()
+    configure_logging()
+    run_server()
 
 
 if __name__ == "__main__":
@@ -1,26 +1,43 @@
 import asyncio
-import aiohttp
+import logging
+from collections import defaultdict
 
-from uc.utils import fetch_with_backoff
+from uc.http_client import get_session, listing_semaphore
+from uc.utils import (
+    async_ttl_cache,
+    get_auth_headers,
+    get_unity_catalog_url,
+    iter_pages,
+)
 
-# Adjust this to control concurrency (Databricks recommends being conservative)
-MAX_CONCURRENT_REQUESTS = 8
-semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-MAX_RETRIES = 5
-BASE_DELAY = 0.5
+# The catalog/schema/table topology changes rarely, so listings are cached for this long
+CATALOG_TTL_SECONDS = 300
+# Maximum number of cached listings per endpoint, the least recently used ones are dropped first
+CATALOG_CACHE_SIZE = 512
 
+logger = logging.getLogger(__name__)
+
+
+def _topology_key(session, databricks_host, headers, *names):
+    # Different tokens may see different catalogs, so the token is part of the key. The host is
+    # normalized like in get_unity_catalog_url, with and without a trailing slash share entries.
+    return (databricks_host.rstrip("/"), headers["Authorization"], *names)
 
-async def get_catalogs(session: str, databricks_host: str, headers: dict) -> list[str]:
-    url = f"{databricks_host}/api/2.1/unity-catalog/catalogs"
-    data = await fetch_with_backoff(
-        session, url, headers, semaphore, MAX_RETRIES, BASE_DELAY
-    )
 
+@async_ttl_cache(CATALOG_TTL_SECONDS, key=_topology_key, maxsize=CATALOG_CACHE_SIZE)
+async def get_catalogs(session: str, databricks_host: str, headers: dict) -> list[str]:
+    url = get_unity_catalog_url(databricks_host) / "catalogs"
     return [
-        c["name"] for c in data.get("catalogs", []) if c["created_by"] != "System user"
+        c["name"]
+        async for page in iter_pages(
+            session, url, headers, "catalogs", listing_semaphore
+        )
+        for c in page
+        if c["created_by"] != "System user"
     ]
 
 
+@async_ttl_cache(CATALOG_TTL_SECONDS, key=_topology_key, maxsize=CATALOG_CACHE_SIZE)
 async def get_schemas_in_catalog(
     session: str, databricks_host: str, headers: dict, catalog_name: str
 ) -> list[str]:
@@ -35,24 +52,29 @@ async def get_schemas_in_catalog(
         list[str]: A list of catalog names, excluding those created by "System user".
     """
 
-    url = f"{databricks_host}/api/2.1/unity-catalog/schemas?catalog_name={catalog_name}"
-    data = await fetch_with_backoff(
-        session, url, headers, semaphore, MAX_RETRIES, BASE_DELAY
+    url = (get_unity_catalog_url(databricks_host) / "schemas").with_query(
+        catalog_name=catalog_name
     )
     return [
-        s["name"] for s in data.get("schemas", []) if s["name"] != "information_schema"
+        s["name"]
+        async for page in iter_pages(
+            session, url, headers, "schemas", listing_semaphore
+        )
+        for s in page
+        if s["name"] != "information_schema"
     ]
 
 
+@async_ttl_cache(CATALOG_TTL_SECONDS, key=_topology_key, maxsize=CATALOG_CACHE_SIZE)
 async def get_tables_in_schema(
     session: str,
     databricks_host: str,
     headers: dict,
     catalog_name: str,
     schema_name: str,
-) -> list[str]:
+) -> tuple[str, str, list[str]]:
     """
-    Asynchronously retrieves all tables from a specified schema within a catalog, in the form of 'catalog.schema.table'.
+    Asynchronously retrieves the names of all tables in a specified schema within a catalog.
 
     Args:
         session (aiohttp.ClientSession): The active HTTP session for making requests.
@@ -60,13 +82,26 @@ async def get_tables_in_schema(
         schema_name (str): The name of the schema within the catalog.
 
     Returns:
-        list[str]: A list of table names in the format 'catalog.schema.table'.
+        tuple[str, str, list[str]]: The catalog name, the schema name and the list of table names in that schema.
     """
-    url = f"{databricks_host}/api/2.1/unity-catalog/tables?catalog_name={catalog_name}&schema_name={schema_name}"
-    data = await fetch_with_backoff(
-        session, url, headers, semaphore, MAX_RETRIES, BASE_DELAY
+    url = (get_unity_catalog_url(databricks_host) / "tables").with_query(
+        catalog_name=catalog_name, schema_name=schema_name
     )
-    return [f"{catalog_name}.{schema_name}.{t['name']}" for t in data.get("tables", [])]
+    table_names = [
+        t["name"]
+        async for page in iter_pages(session, url, headers, "tables", listing_semaphore)
+        for t in page
+    ]
+    return catalog_name, schema_name, table_names
+
+
+def invalidate_topology_cache():
+    """
+    Drops all cached catalog, schema and table listings, so the next call fetches them from Databricks again.
+    """
+    get_catalogs.cache_invalidate()
+    get_schemas_in_catalog.cache_invalidate()
+    get_tables_in_schema.cache_invalidate()
 
 
 async def get_all_tables_asynchronous(
@@ -79,78 +114,85 @@ async def get_all_tables_asynchronous(
     The function performs the following steps:
         1. Fetches all available catalogs.
         2. For each catalog, fetches all schemas concurrently.
-        3. For each schema in each catalog, fetches all tables concurrently.
+        3. For each schema in each catalog, fetches all tables concurrently, starting as soon as
+           the schemas of its catalog are known.
         4. Organizes the results into a nested dictionary of the form:
            {catalog_name: {schema_name: [table_name, ...], ...}, ...}
+           Catalogs and schemas are in the order the API returns them, those without tables are left out.
 
     Returns:
         dict[str, dict[str, list[str]]]:
             A nested dictionary mapping catalog names to schema names to lists of table names.
     """
 
-    async with aiohttp.ClientSession() as session:
-        # Step 1: Get all catalogs
-        catalogs = await get_catalogs(session, databricks_host, headers)
-        print(f"Found catalogs: {catalogs}")
-
-        # Step 2: Get all schemas in all catalogs concurrently
-        schema_tasks = [
-            get_schemas_in_catalog(session, databricks_host, headers, catalog)
-            for catalog in catalogs
-        ]
-        schemas_per_catalog = await asyncio.gather(*schema_tasks)
-        catalog_schema_pairs = [
-            (catalog, schema)
-            for catalog, schemas in zip(catalogs, schemas_per_catalog)
-            for schema in schemas
-        ]
-        print(f"Found {len(catalog_schema_pairs)} schemas in all catalogs.")
-
-        # Step 3: Get all tables in all schemas in all catalogs concurrently
-        table_tasks = [
-            get_tables_in_schema(session, databricks_host, headers, catalog, schema)
-            for catalog, schema in catalog_schema_pairs
-        ]
-        tables_nested = await asyncio.gather(*table_tasks)
-        all_tables = [tbl for sublist in tables_nested for tbl in sublist]
-
-        print(f"\nFound {len(all_tables)} tables in total:")
-
-        # Return a list of all full tablenames
-        # return all_tables
-
-        # Return a dict
-        full_catalog_dict = {}
-        for table in all_tables:
-            catalog_name, schema_name, table_name = table.split(".")
-            if catalog_name not in full_catalog_dict:
-                full_catalog_dict[catalog_name] = {}
-            if schema_name not in full_catalog_dict[catalog_name]:
-                full_catalog_dict[catalog_name][schema_name] = []
-            full_catalog_dict[catalog_name][schema_name].append(table_name)
-
-        return full_catalog_dict
-
-
-async def get_all_tables(databricks_host: str, databricks_token: str) -> dict[str, any]:
+    session = await get_session()
+
+    # Step 1: Get all catalogs
+    catalogs = await get_catalogs(session, databricks_host, headers)
+    logger.debug("Found %d catalogs", len(catalogs))
+
+    # Step 2 and 3: Get all schemas in all catalogs concurrently, and get the tables of a
+    # catalog's schemas as soon as that catalog's schemas are known, instead of waiting for
+    # the schemas of every catalog. All tasks share one task group, which cancels the rest
+    # if one of them fails.
+    # The catalog and schema keys are created in API order before the tables come in, so the
+    # output order doesn't depend on which request finishes first
+    full_catalog_dict = defaultdict(lambda: defaultdict(list))
+    for catalog in catalogs:
+        full_catalog_dict[catalog]
+    schema_count = 0
+
+    async def get_tables(catalog: str, schema: str):
+        _, _, table_names = await get_tables_in_schema(
+            session, databricks_host, headers, catalog, schema
+        )
+        full_catalog_dict[catalog][schema].extend(table_names)
+
+    async def get_schemas(catalog: str):
+        nonlocal schema_count
+        schemas = await get_schemas_in_catalog(
+            session, databricks_host, headers, catalog
+        )
+        schema_count += len(schemas)
+        for schema in schemas:
+            full_catalog_dict[catalog][schema]
+            task_group.create_task(get_tables(catalog, schema))
+
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            for catalog in catalogs:
+                task_group.create_task(get_schemas(catalog))
+    except ExceptionGroup as eg:
+        # Surface the first failure itself, so the tool error says what went wrong
+        raise eg.exceptions[0]
+    logger.debug("Found %d schemas in all catalogs", schema_count)
+
+    # Step 4: Drop the schemas without tables, and the catalogs left without schemas
+    result = {}
+    table_count = 0
+    for catalog, schemas in full_catalog_dict.items():
+        schemas = {schema: tables for schema, tables in schemas.items() if tables}
+        if schemas:
+            result[catalog] = schemas
+            table_count += sum(map(len, schemas.values()))
+
+    logger.debug("Found %d tables in total", table_count)
+
+    return result
+
+
+async def get_all_tables(
+    databricks_host: str, databricks_token: str
+) -> dict[str, dict[str, list[str]]]:
     """
-    Asynchronously retrieves all tables from the Databricks Unity Catalog, returning the results
-    in a standardized response dictionary indicating success or error.
+    Asynchronously retrieves all tables from the Databricks Unity Catalog.
 
-    This function wraps `get_all_tables_asynchronous()` with error handling, returning a dictionary
-    that contains either the retrieved tables and a success status, or an error message.
+    This function wraps `get_all_tables_asynchronous()` with the authentication headers for the token.
+    Errors are raised rather than returned, so the MCP server reports them as a failed tool call.
 
     Returns:
-        dict[str, any]:
-            On success: {"resource": <nested catalog-schema-table dict>, "status": "success"}
-            On failure: {"error": {"message": <error message>}}
+        dict[str, dict[str, list[str]]]:
+            A nested dictionary mapping catalog names to schema names to lists of table names.
     """
-    headers = {
-        "Authorization": f"Bearer {databricks_token}",
-        "Content-Type": "application/json",
-    }
-    try:
-        all_tables = await get_all_tables_asynchronous(databricks_host, headers)
-        return {"resource": all_tables, "status": "success"}
-    except Exception as e:
-        return {"error": {"message": str(e)}}
+    headers = get_auth_headers(databricks_token)
+    return await get_all_tables_asynchronous(databricks_host, headers)
@@ -1,20 +1,46 @@
 import asyncio
+from operator import itemgetter
+from urllib.parse import quote
+
 import aiohttp
 
-from uc.utils import fetch_with_backoff
+from uc.http_client import MAX_CONCURRENT_DETAIL_REQUESTS, get_session
+from uc.utils import (
+    async_ttl_cache,
+    fetch_with_backoff,
+    get_auth_headers,
+    get_unity_catalog_url,
+)
+
+# Fields kept from each column of the table details response. Of the table itself only the
+# name, catalog and schema are kept ("comment" is not available in every table).
+_column_fields = itemgetter("name", "type_text")
+# Ask Databricks to leave out metadata that is dropped anyway, to keep the responses small
+TABLE_DETAILS_QUERY = {
+    "include_delta_metadata": "false",
+    "include_browse": "false",
+    "include_manifest_capabilities": "false",
+}
+# Columns and types change rarely, so table details are cached for this long
+TABLE_DETAILS_TTL_SECONDS = 600
+# Maximum number of cached table details, the least recently used ones are dropped first
+TABLE_DETAILS_CACHE_SIZE = 4096
 
-# Adjust this to control concurrency (Databricks recommends being conservative)
-MAX_CONCURRENT_REQUESTS = 8
-semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-MAX_RETRIES = 5
-BASE_DELAY = 0.5
 
+def _table_details_key(session, databricks_host, headers, full_table_name):
+    # Different tokens may have access to different tables, so the token is part of the key.
+    # The host is normalized like in get_unity_catalog_url.
+    return (databricks_host.rstrip("/"), headers["Authorization"], full_table_name)
 
+
+@async_ttl_cache(
+    TABLE_DETAILS_TTL_SECONDS, key=_table_details_key, maxsize=TABLE_DETAILS_CACHE_SIZE
+)
 async def get_single_table_details(
     session: aiohttp.ClientSession,
     databricks_host: str,
     headers: dict[str, str],
-    full_table_name: list[str],
+    full_table_name: str,
 ):
     """
     Asynchronously retrieves detailed metadata for a single table from the Databricks Unity Catalog API.
@@ -28,19 +54,39 @@ async def get_single_table_details(
     Returns:
         dict: The JSON response containing table metadata and details.
 
+    Raises:
+        ValueError: If the table name isn't in the format 'catalog.schema.table'.
     """
-    url = f"{databricks_host}/api/2.1/unity-catalog/tables/{full_table_name}"
-    data = await fetch_with_backoff(
-        session, url, headers, semaphore, MAX_RETRIES, BASE_DELAY
+    parts = full_table_name.split(".")
+    if len(parts) != 3 or not all(parts):
+        raise ValueError(
+            f"Invalid table name {full_table_name!r}, expected the format 'catalog.schema.table'"
+        )
+    # Each part is encoded on its own, so characters like '/' or '#' in a name stay in the path segment
+    encoded_name = ".".join(quote(part, safe="") for part in parts)
+    url = (
+        (get_unity_catalog_url(databricks_host) / "tables")
+        .joinpath(encoded_name, encoded=True)
+        .with_query(TABLE_DETAILS_QUERY)
     )
+    data = await fetch_with_backoff(session, url, headers)
     return data
 
 
+def invalidate_table_details_cache():
+    """
+    Drops all cached table details, so the next call fetches them from Databricks again.
+    """
+    get_single_table_details.cache_invalidate()
+
+
 async def get_all_table_details_asynchronous(
     databricks_host: str, headers: dict, full_table_names: list[str]
-) -> list[dict[str, any]]:
+) -> dict[str, list[dict[str, any]]]:
     """
     Asynchronously retrieves detailed metadata for multiple tables from the Databricks Unity Catalog API.
+    A table that fails (e.g. a typo in its name or missing permissions) doesn't fail the others, it is
+    reported under "errors" instead. Only when every table fails is the first error raised.
 
     Args:
         databricks_host (str): The Databricks workspace host URL.
@@ -48,41 +94,64 @@ async def get_all_table_details_asynchronous(
         full_table_names (list[str]): A list of fully qualified table names in the format 'catalog.schema.table'.
 
     Returns:
-        list[dict[str, any]]: A list of dictionaries containing selected metadata for each table, including table name, catalog, schema, and columns (with only name and type_text for each column).
+        dict[str, list[dict[str, any]]]:
+            {"tables": <list of dictionaries containing selected metadata for each table, including table name, catalog, schema, and columns (with only name and type_text for each column)>,
+             "errors": <list of {"full_table_name": <name>, "message": <error message>} for the tables that failed>}
     """
-    async with aiohttp.ClientSession() as session:
-        table_tasks = [
-            get_single_table_details(session, databricks_host, headers, full_table_name)
-            for full_table_name in full_table_names
-        ]
-        tables_nested = await asyncio.gather(*table_tasks)
-        keys_to_include = [
-            "name",
-            "catalog_name",
-            "schema_name",
-            "columns",
-            # "comment" Not available in every table
-        ]
-        result = [
-            {
-                **t,
-                "columns": [
-                    {"name": c["name"], "type_text": c["type_text"]}
-                    for c in t["columns"]
-                ],
-            }
-            for t in [
-                {key: table[key] for key in keys_to_include} for table in tables_nested
-            ]
-        ]
-        return result
+    session = await get_session()
+
+    # A fixed pool of workers drains a queue of table names, so only MAX_CONCURRENT_DETAIL_REQUESTS
+    # coroutines exist at a time no matter how many tables are requested
+    queue = asyncio.Queue()
+    for index, full_table_name in enumerate(full_table_names):
+        queue.put_nowait((index, full_table_name))
+    tables_nested = [None] * len(full_table_names)
+    failures = []
+
+    async def worker():
+        while not queue.empty():
+            index, full_table_name = queue.get_nowait()
+            try:
+                tables_nested[index] = await get_single_table_details(
+                    session, databricks_host, headers, full_table_name
+                )
+            except Exception as e:
+                failures.append((index, full_table_name, e))
+
+    num_workers = min(MAX_CONCURRENT_DETAIL_REQUESTS, len(full_table_names))
+    await asyncio.gather(*(worker() for _ in range(num_workers)))
+
+    failures.sort(key=itemgetter(0))
+    if failures and len(failures) == len(full_table_names):
+        raise failures[0][2]
+    # Not every securable returned by the tables endpoint has a columns list
+    result = [
+        {
+            "name": t["name"],
+            "catalog_name": t["catalog_name"],
+            "schema_name": t["schema_name"],
+            "columns": [
+                {"name": column_name, "type_text": type_text}
+                for column_name, type_text in map(_column_fields, t.get("columns", ()))
+            ],
+        }
+        for t in tables_nested
+        if t is not None
+    ]
+    errors = [
+        {"full_table_name": full_table_name, "message": str(e)}
+        for _, full_table_name, e in failures
+    ]
+    return {"tables": result, "errors": errors}
 
 
 async def get_table_details(
     databricks_host, databricks_token, full_table_names
-) -> dict[str, any]:
+) -> dict[str, list[dict[str, any]]]:
     """
-    Asynchronously retrieves metadata for multiple Databricks tables and returns the results in a standardized response format.
+    Asynchronously retrieves metadata for multiple Databricks tables.
+    Tables that fail are listed under "errors". When all of them fail the error is raised,
+    so the MCP server reports it as a failed tool call.
 
     Args:
         databricks_host (str): The Databricks workspace host URL.
@@ -90,18 +159,9 @@ async def get_table_details(
         full_table_names (list[str]): A list of fully qualified table names in the format 'catalog.schema.table'.
 
     Returns:
-        dict[str, any]: On success, returns {"resource": <list of table metadata>, "status": "success"}.
-                        On failure, returns {"error": {"message": <error message>}}.
+        dict[str, list[dict[str, any]]]: {"tables": <list of table metadata>, "errors": <list of failed tables and their error message>}
     """
-    headers = {
-        "Authorization": f"Bearer {databricks_token}",
-        "Content-Type": "application/json",
-    }
-    try:
-        all_table_details = await get_all_table_details_asynchronous(
-            databricks_host, headers, full_table_names
-        )
-        return {"resource": all_table_details, "status": "success"}
-    except Exception as e:
-        print(e)
-        return {"error": {"message": str(e)}}
+    headers = get_auth_headers(databricks_token)
+    return await get_all_table_details_asynchronous(
+        databricks_host, headers, full_table_names
+    )
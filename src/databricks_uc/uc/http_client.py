@@ -0,0 +1,112 @@
+import os
+import asyncio
+import time
+from typing import Iterable
+
+import aiohttp
+
+# Connection limit of the session, requests beyond it wait for a free connection.
+# Can be changed through the environment for workspaces that tolerate a different fan-out.
+MAX_CONCURRENT_REQUESTS = max(
+    2, int(os.getenv("DATABRICKS_UC_MAX_CONCURRENT_REQUESTS", "40"))
+)
+# The connections are split between the endpoints (Databricks recommends being conservative).
+# The listing endpoints (catalogs, schemas, tables) are rate limited more strictly than the
+# table details endpoint, so they get a fifth of them and table details get the rest.
+MAX_CONCURRENT_LISTING_REQUESTS = max(1, MAX_CONCURRENT_REQUESTS // 5)
+MAX_CONCURRENT_DETAIL_REQUESTS = (
+    MAX_CONCURRENT_REQUESTS - MAX_CONCURRENT_LISTING_REQUESTS
+)
+listing_semaphore = asyncio.Semaphore(MAX_CONCURRENT_LISTING_REQUESTS)
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+# Per request: seconds in total, and seconds to open a new socket to the host. Waiting for a free
+# pooled connection is not capped separately, so requests queued locally don't time out.
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=10)
+WARM_UP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+# Headers that don't depend on the token are sent with every request of the session.
+# aiohttp adds Accept-Encoding itself, including br and zstd when their decoders are installed.
+SESSION_HEADERS = {
+    "Content-Type": "application/json",
+}
+
+_session: aiohttp.ClientSession | None = None
+_session_lock = asyncio.Lock()
+# When each host was last warmed up, see warm_connections
+_warmed_at: dict[str, float] = {}
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """
+    Returns the aiohttp ClientSession shared by all tool invocations, creating it on first use.
+
+    Reusing one session keeps the connection pool alive between tool calls, so requests to the
+    Databricks host reuse open TLS connections instead of doing a new handshake every time.
+
+    Returns:
+        aiohttp.ClientSession: The shared HTTP session.
+    """
+    global _session
+    if _session is None or _session.closed:
+        async with _session_lock:
+            if _session is None or _session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=MAX_CONCURRENT_REQUESTS,
+                    limit_per_host=MAX_CONCURRENT_REQUESTS,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=DNS_CACHE_TTL,
+                )
+                _session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=REQUEST_TIMEOUT,
+                    headers=SESSION_HEADERS,
+                )
+    return _session
+
+
+async def warm_connections(hosts: Iterable[str]):
+    """
+    Opens a connection to each workspace host ahead of the first real request. This resolves the
+    host into the connector's DNS cache and leaves a TLS connection in the pool for
+    KEEPALIVE_TIMEOUT seconds, so the first tool call doesn't pay for the lookup and handshake.
+
+    A host is warmed at most once per KEEPALIVE_TIMEOUT, while its connection may still be pooled.
+    Failures are ignored, the actual request will report them.
+
+    Args:
+        hosts (Iterable[str]): The Databricks workspace host URLs.
+    """
+    session = await get_session()
+    now = time.monotonic()
+    hosts = {host.rstrip("/") for host in hosts}
+    # Recorded before sending, so concurrent calls don't warm the same host twice
+    hosts = [
+        host
+        for host in hosts
+        if host not in _warmed_at or now - _warmed_at[host] >= KEEPALIVE_TIMEOUT
+    ]
+    for host in hosts:
+        _warmed_at[host] = now
+
+    async def warm(host: str):
+        try:
+            async with session.head(
+                host, allow_redirects=False, timeout=WARM_UP_TIMEOUT
+            ):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+
+    await asyncio.gather(*(warm(host) for host in hosts))
+
+
+async def close_session():
+    """
+    Closes the shared aiohttp ClientSession, if one was created. Called on server shutdown.
+    """
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _warmed_at.clear()
@@ -1,30 +1,436 @@
 import asyncio
+import contextlib
+import functools
+import logging
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Callable, Hashable, Mapping
+
 import aiohttp
+import orjson
+from yarl import URL
 
+logger = logging.getLogger(__name__)
 
-async def fetch_with_backoff(
+# Retry settings shared by every Databricks request
+MAX_RETRIES = 5
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+# Statuses that are retried after a delay: Too Many Requests and Service Unavailable
+RETRY_STATUSES = frozenset({429, 503})
+# Stop calling a host after this many consecutive failures, for the cooldown period. A failure is a
+# non-retryable 5xx response, a timeout or connection error, or a request that ran out of retries.
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN_SECONDS = 30.0
+# Client-side request rate per host, in requests per second. Requests are unthrottled until more
+# than RATE_THROTTLE_THRESHOLD of the responses in a window were 429s. Then the rate is halved for
+# every such window and grows by 10% for every other one, until it passes RATE_LIMIT_MAX again.
+RATE_LIMIT_MIN = 1.0
+RATE_LIMIT_MAX = 100.0
+RATE_WINDOW_SECONDS = 5.0
+RATE_THROTTLE_THRESHOLD = 0.05
+# Fewer responses than this in a window are too few to decide to throttle on
+RATE_MIN_SAMPLES = 20
+# Page size requested from the Unity Catalog list endpoints (the API maximum), the server may
+# cap it lower. Large pages keep the number of round-trips per listing down.
+PAGE_SIZE = 10000
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is refused because the circuit breaker for its host is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures against a host and refuses requests for a cooldown period
+    once `failure_threshold` is reached, so a failing Databricks workspace isn't flooded with retries.
+
+    After the cooldown a single trial request is let through (half-open). If it succeeds the
+    breaker closes again, if it fails the cooldown starts over.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        cooldown_seconds: float = CIRCUIT_COOLDOWN_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at >= self.cooldown_seconds:
+            # Half-open: let this request through as the trial, and hold back the rest for another cooldown
+            self._opened_at = now
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+
+
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(host: str) -> CircuitBreaker:
+    """
+    Returns the circuit breaker for a host, creating it on first use.
+    """
+    breaker = _circuit_breakers.get(host)
+    if breaker is None:
+        breaker = _circuit_breakers[host] = CircuitBreaker()
+    return breaker
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket limiting the request rate to a host, with a rate that adapts to how often
+    Databricks throttles. Every `window_seconds` the share of 429 responses is checked: above
+    `throttle_threshold` the rate is halved, otherwise it grows by 10%, down to `min_rate`.
+
+    Until Databricks throttles there is no limit, so an uncongested host gets the full concurrency
+    of the session. The first throttled window sets the rate to half of the rate observed in it,
+    and once the rate grows past `max_rate` the limit is lifted again.
+
+    A window starts at the first response recorded in it. When no response comes in for longer
+    than `window_seconds`, the window so far is discarded rather than judged, so an idle period
+    doesn't skew the 429 share or the observed rate. A window with fewer than `min_samples`
+    responses never lowers the rate.
+    """
+
+    def __init__(
+        self,
+        min_rate: float = RATE_LIMIT_MIN,
+        max_rate: float = RATE_LIMIT_MAX,
+        window_seconds: float = RATE_WINDOW_SECONDS,
+        throttle_threshold: float = RATE_THROTTLE_THRESHOLD,
+        min_samples: int = RATE_MIN_SAMPLES,
+    ):
+        # None while unthrottled
+        self.rate: float | None = None
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.window_seconds = window_seconds
+        self.throttle_threshold = throttle_threshold
+        self.min_samples = min_samples
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        # None until the first response of a window is recorded
+        self._window_start: float | None = None
+        self._last_record = self._last_refill
+        self._total = 0
+        self._throttled = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        # The bucket holds at most one second worth of requests
+        self._tokens = min(
+            self.rate, self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+
+    async def acquire(self):
+        """
+        Waits until a request may be sent. Waiters are served in order.
+        """
+        if self.rate is None:
+            return
+        async with self._lock:
+            # The limit may have been lifted while waiting for the lock
+            while self.rate is not None:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def _lower_rate(self, now: float, elapsed: float):
+        if self.rate is None:
+            # Start from half of what was actually sent in the window, with a full bucket
+            observed_rate = self._total / elapsed
+            self.rate = min(self.max_rate, max(self.min_rate, observed_rate * 0.5))
+            self._tokens = self.rate
+            self._last_refill = now
+        else:
+            self.rate = max(self.min_rate, self.rate * 0.5)
+
+    def record(self, throttled: bool):
+        """
+        Records the outcome of a request, and adapts the rate at the end of each window.
+        """
+        now = time.monotonic()
+        if self._window_start is None or now - self._last_record > self.window_seconds:
+            self._window_start = now
+            self._total = 0
+            self._throttled = 0
+        self._last_record = now
+        self._total += 1
+        if throttled:
+            self._throttled += 1
+        elapsed = now - self._window_start
+        if elapsed < self.window_seconds:
+            return
+        if self._throttled / self._total > self.throttle_threshold:
+            # A few 429s out of a few responses are too little to go on
+            if self._total >= self.min_samples:
+                self._lower_rate(now, elapsed)
+        elif self.rate is not None:
+            self.rate *= 1.1
+            if self.rate > self.max_rate:
+                self.rate = None
+        self._window_start = None
+
+
+_rate_limiters: dict[str, AdaptiveRateLimiter] = {}
+
+
+def get_rate_limiter(host: str) -> AdaptiveRateLimiter:
+    """
+    Returns the rate limiter for a host, creating it on first use.
+    """
+    limiter = _rate_limiters.get(host)
+    if limiter is None:
+        limiter = _rate_limiters[host] = AdaptiveRateLimiter()
+    return limiter
+
+
+@functools.lru_cache(maxsize=32)
+def get_unity_catalog_url(databricks_host: str) -> URL:
+    """
+    Returns the base URL of the Unity Catalog API for a workspace host. Parsed once per host;
+    endpoints are derived with `/` and `with_query()`, which encode path segments and query
+    values, so aiohttp doesn't need to parse a URL string for every request.
+
+    Args:
+        databricks_host (str): The Databricks workspace host URL, with or without a trailing slash.
+
+    Returns:
+        URL: The Unity Catalog API base URL, e.g. 'https://<workspace>/api/2.1/unity-catalog'.
+    """
+    return URL(databricks_host.rstrip("/")) / "api" / "2.1" / "unity-catalog"
+
+
+@functools.lru_cache(maxsize=32)
+def get_auth_headers(databricks_token: str) -> Mapping[str, str]:
+    """
+    Returns the Authorization header for a Databricks token. Built once per token and shared read-only
+    by every request made with it. The other headers are set on the shared session.
+
+    Args:
+        databricks_token (str): The Databricks personal access token for authentication.
+
+    Returns:
+        Mapping[str, str]: Read-only mapping with the Authorization header.
+    """
+    return MappingProxyType({"Authorization": f"Bearer {databricks_token}"})
+
+
+def _retry_after_seconds(response: aiohttp.ClientResponse) -> float | None:
+    """
+    Returns the number of seconds to wait from the response's Retry-After header, which is either
+    a number of seconds or an HTTP date. Returns None if the header is absent or can't be parsed.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+# Requests currently in flight, keyed on (url, Authorization header)
+_in_flight: dict[tuple[URL, str | None], asyncio.Future] = {}
+
+
+async def _fetch_with_retries(
     session: aiohttp.ClientSession,
-    url: str,
-    headers: dict,
-    semaphore: asyncio.Semaphore,
-    max_retries: int = 5,
-    base_delay: float = 0.5,
+    url: URL,
+    headers: Mapping[str, str],
+    semaphore: asyncio.Semaphore | None = None,
+    max_retries: int = MAX_RETRIES,
+    base_delay: float = BASE_DELAY,
+    max_delay: float = MAX_DELAY,
 ) -> dict:
     """
-    Asynchronously fetches JSON data from a given URL using an aiohttp ClientSession,
-    with automatic retries and exponential backoff on HTTP 429 (Too Many Requests) responses.
+    Performs the actual request for `fetch_with_backoff`, see there for the retry behaviour.
     """
-    delay = base_delay
+    host = url.host
+    breaker = get_circuit_breaker(host)
+    limiter = get_rate_limiter(host)
     for attempt in range(max_retries):
-        async with semaphore:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 429:
-                    print(
-                        f"429 Too Many Requests for {url}. Retrying in {delay} seconds..."
-                    )
-                    await asyncio.sleep(delay)
-                    delay *= 2  # Exponential backoff
-                    continue
-                response.raise_for_status()
-                return await response.json()
+        if not breaker.allow_request():
+            raise CircuitOpenError(
+                f"Too many consecutive failures for {url}, not retrying for now"
+            )
+        body = None
+        # The semaphore guards only the request itself, not the backoff sleep below
+        async with semaphore or contextlib.nullcontext():
+            await limiter.acquire()
+            try:
+                async with session.get(url, headers=headers) as response:
+                    limiter.record(response.status == 429)
+                    # Retryable statuses only count as a failure once the retries are used up (below),
+                    # otherwise a short burst of 503s across concurrent requests opens the breaker
+                    # and aborts the requests that would have succeeded on their next attempt
+                    if response.status not in RETRY_STATUSES:
+                        if response.status >= 500:
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
+                        response.raise_for_status()
+                        body = await response.read()
+                    else:
+                        retry_after = _retry_after_seconds(response)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                breaker.record_failure()
+                raise
+
+        if body is not None:
+            # Decoded after the connection went back to the pool, so it isn't held during parsing
+            return orjson.loads(body)
+
+        # Sleep after the response is released, so a throttled request doesn't hold a connection while waiting
+        if retry_after is not None:
+            delay = min(max_delay, retry_after)
+        else:
+            delay = min(max_delay, base_delay * 2**attempt) * random.uniform(0.5, 1.5)
+        logger.debug(
+            "%d response for %s; retrying in %.2fs", response.status, url, delay
+        )
+        await asyncio.sleep(delay)
+    breaker.record_failure()
     raise Exception(f"Max retries {max_retries} exceeded for URL: {url}")
+
+
+async def fetch_with_backoff(
+    session: aiohttp.ClientSession,
+    url: URL,
+    headers: Mapping[str, str],
+    semaphore: asyncio.Semaphore | None = None,
+    max_retries: int = MAX_RETRIES,
+    base_delay: float = BASE_DELAY,
+    max_delay: float = MAX_DELAY,
+) -> dict:
+    """
+    Asynchronously fetches JSON data from a given URL using an aiohttp ClientSession,
+    with automatic retries on HTTP 429 (Too Many Requests) and 503 (Service Unavailable) responses.
+
+    When Databricks sends a Retry-After header the request waits exactly that long. Otherwise the
+    backoff is exponential and jittered, so concurrent requests that were throttled together don't
+    retry in lockstep. Either way a single wait is capped at `max_delay`.
+
+    Concurrency is capped by the session's connector. A `semaphore` can be passed to cap a group
+    of endpoints lower than that.
+
+    Identical requests (same URL and Authorization header) that are in flight at the same time
+    are coalesced: later callers wait for the first request instead of sending their own.
+    The returned dict is shared between those callers and must not be modified.
+
+    Raises:
+        CircuitOpenError: If the host had too many consecutive failures recently (non-retryable 5xx
+            responses, timeouts or connection errors, or requests that ran out of retries).
+    """
+    key = (url, headers.get("Authorization"))
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _fetch_with_retries(
+                session, url, headers, semaphore, max_retries, base_delay, max_delay
+            )
+        )
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    # Shielded, so a cancelled caller doesn't cancel the request for the other callers
+    return await asyncio.shield(task)
+
+
+async def iter_pages(
+    session: aiohttp.ClientSession,
+    url: URL,
+    headers: Mapping[str, str],
+    key: str,
+    semaphore: asyncio.Semaphore | None = None,
+    page_size: int = PAGE_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """
+    Iterates over the pages of a Unity Catalog list endpoint, following `next_page_token` until it is absent.
+    Each page is yielded as soon as it arrives, so callers can keep only the fields they need
+    instead of every full response.
+
+    Args:
+        session (aiohttp.ClientSession): The active HTTP session for making requests.
+        url (URL): The URL of the list endpoint, optionally with query parameters.
+        headers (Mapping[str, str]): HTTP headers to include the authorization.
+        key (str): The key of the items list in the response, e.g. "tables".
+        semaphore (asyncio.Semaphore | None): Optional semaphore limiting the concurrent requests to the endpoint.
+        page_size (int): The number of items to request per page.
+
+    Yields:
+        list[dict]: The items of one page.
+    """
+    first_page_url = url.update_query(max_results=page_size)
+    page_url = first_page_url
+    while True:
+        data = await fetch_with_backoff(session, page_url, headers, semaphore)
+        yield data.get(key, [])
+        next_page_token = data.get("next_page_token")
+        if not next_page_token:
+            return
+        page_url = first_page_url.update_query(page_token=next_page_token)
+
+
+def async_ttl_cache(
+    ttl_seconds: float, key: Callable[..., Hashable], maxsize: int | None = None
+):
+    """
+    Caches the result of a coroutine function for `ttl_seconds`, keyed on `key(*args, **kwargs)`.
+
+    The key function decides the identity of a call, so unhashable arguments such as the
+    aiohttp session or the headers dict can be left out of it. With `maxsize` set, the least
+    recently used entry is evicted once the cache is full. The decorated function gets a
+    `cache_invalidate()` attribute to drop all cached entries.
+    """
+
+    def decorator(func):
+        entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            entry = entries.get(cache_key)
+            if entry is not None and time.monotonic() - entry[0] < ttl_seconds:
+                entries.move_to_end(cache_key)
+                return entry[1]
+            value = await func(*args, **kwargs)
+            entries[cache_key] = (time.monotonic(), value)
+            entries.move_to_end(cache_key)
+            if maxsize is not None and len(entries) > maxsize:
+                entries.popitem(last=False)
+            return value
+
+        wrapper.cache_invalidate = entries.clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,69 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from uc.get_all_tables import (
+    _topology_key,
+    get_all_tables,
+    invalidate_topology_cache,
+)
+from uc.http_client import close_session
+
+# Later catalogs and schemas respond faster, so their requests finish first
+CATALOGS = ["c1", "c2", "c3"]
+SCHEMAS = ["s1", "s2", "empty"]
+
+
+def _delay(name: str) -> float:
+    return 0.01 * (3 - int(name[-1])) if name[-1].isdigit() else 0
+
+
+async def catalogs(request):
+    return web.json_response(
+        {"catalogs": [{"name": c, "created_by": "someone"} for c in CATALOGS]}
+    )
+
+
+async def schemas(request):
+    await asyncio.sleep(_delay(request.query["catalog_name"]))
+    return web.json_response({"schemas": [{"name": s} for s in SCHEMAS]})
+
+
+async def tables(request):
+    schema = request.query["schema_name"]
+    await asyncio.sleep(_delay(schema))
+    if schema == "empty":
+        return web.json_response({})
+    return web.json_response({"tables": [{"name": f"{schema}_t"}]})
+
+
+async def _get_all_tables() -> dict:
+    app = web.Application()
+    app.router.add_get("/api/2.1/unity-catalog/catalogs", catalogs)
+    app.router.add_get("/api/2.1/unity-catalog/schemas", schemas)
+    app.router.add_get("/api/2.1/unity-catalog/tables", tables)
+    invalidate_topology_cache()
+    try:
+        async with TestServer(app) as server:
+            return await get_all_tables(str(server.make_url("/")), "token")
+    finally:
+        invalidate_topology_cache()
+        await close_session()
+
+
+def test_catalogs_and_schemas_keep_the_api_order():
+    result = asyncio.run(_get_all_tables())
+
+    assert list(result) == CATALOGS
+    for catalog in CATALOGS:
+        assert list(result[catalog]) == ["s1", "s2"]
+        assert result[catalog]["s1"] == ["s1_t"]
+
+
+def test_host_with_trailing_slash_shares_the_cache():
+    headers = {"Authorization": "Bearer token"}
+
+    assert _topology_key(None, "https://host/", headers, "c1") == _topology_key(
+        None, "https://host", headers, "c1"
+    )
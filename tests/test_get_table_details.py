@@ -0,0 +1,9 @@
+from uc.get_table_details import _table_details_key
+
+
+def test_host_with_trailing_slash_shares_the_cache():
+    headers = {"Authorization": "Bearer token"}
+
+    assert _table_details_key(None, "https://host/", headers, "c.s.t") == (
+        _table_details_key(None, "https://host", headers, "c.s.t")
+    )
@@ -0,0 +1,119 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from uc import utils
+
+
+@pytest.fixture(autouse=True)
+def reset_host_state():
+    # Circuit breakers and rate limiters are kept per host, and every test server runs on 127.0.0.1
+    utils._circuit_breakers.clear()
+    utils._rate_limiters.clear()
+    yield
+    utils._circuit_breakers.clear()
+    utils._rate_limiters.clear()
+
+
+async def _fetch_all(app: web.Application, paths: list[str], **kwargs) -> list:
+    async with TestServer(app) as server, aiohttp.ClientSession() as session:
+        return await asyncio.gather(
+            *(
+                utils.fetch_with_backoff(session, server.make_url(path), {}, **kwargs)
+                for path in paths
+            ),
+            return_exceptions=True,
+        )
+
+
+def test_burst_of_503s_is_retried_without_opening_the_circuit():
+    # Every request is answered with a 503 on its first attempt, more concurrent 503s than the
+    # breaker's failure threshold
+    seen = set()
+
+    async def handler(request):
+        path = request.path
+        if path not in seen:
+            seen.add(path)
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return web.json_response({"path": path})
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    paths = [f"/t{i}" for i in range(4 * utils.CIRCUIT_FAILURE_THRESHOLD)]
+
+    results = asyncio.run(_fetch_all(app, paths))
+
+    assert results == [{"path": path} for path in paths]
+    assert utils.get_circuit_breaker("127.0.0.1").allow_request()
+
+
+def test_request_that_runs_out_of_retries_counts_as_one_failure():
+    async def handler(request):
+        return web.Response(status=503, headers={"Retry-After": "0"})
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+
+    (result,) = asyncio.run(_fetch_all(app, ["/t"], max_retries=3))
+
+    assert "Max retries 3 exceeded" in str(result)
+    assert utils.get_circuit_breaker("127.0.0.1")._failures == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(utils.time, "monotonic", fake)
+    return fake
+
+
+def _record_traffic(
+    limiter, clock, seconds: float, per_second: int, throttled_every: int = 0
+):
+    for i in range(int(seconds * per_second)):
+        clock.now += 1 / per_second
+        limiter.record(throttled_every > 0 and i % throttled_every == 0)
+
+
+def test_idle_period_does_not_count_towards_the_next_window(clock):
+    limiter = utils.AdaptiveRateLimiter()
+    _record_traffic(limiter, clock, seconds=6, per_second=20)
+    # Close the window right before going idle
+    clock.now += utils.RATE_WINDOW_SECONDS
+    limiter.record(False)
+
+    clock.now += 600
+    limiter.record(True)
+
+    assert limiter.rate is None
+
+
+def test_first_rate_is_based_on_the_active_part_of_the_window(clock):
+    limiter = utils.AdaptiveRateLimiter()
+    limiter.record(False)
+    clock.now += 600
+    # 40 requests per second, every second one throttled
+    _record_traffic(limiter, clock, seconds=6, per_second=40, throttled_every=2)
+
+    assert limiter.rate == pytest.approx(20, rel=0.05)
+
+
+def test_too_few_responses_do_not_lower_the_rate(clock):
+    limiter = utils.AdaptiveRateLimiter()
+    for _ in range(utils.RATE_MIN_SAMPLES - 1):
+        clock.now += utils.RATE_WINDOW_SECONDS / (utils.RATE_MIN_SAMPLES - 2)
+        limiter.record(True)
+
+    assert limiter.rate is None